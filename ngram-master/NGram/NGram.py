@@ -4,8 +4,9 @@ NGram Language Model
 from collections import Counter
 from math import log10
 from os import linesep
-from itertools import product
-import re
+from itertools import product, accumulate
+from bisect import bisect_left
+from sys import intern
 import random
 
 class NGram(object):
@@ -18,10 +19,19 @@ class NGram(object):
     def __init__(self, N, trainingdata, smoothing=False):
         self.ngrams = Counter()
         self.wordcount = Counter()
+        self.prefix_totals = Counter()
         self.N = N
-        self.regex = None
         self.smoothing = smoothing
+        self._probability_cache = dict()
         self._read_training_data(trainingdata)
+        self._build_successor_index()
+
+        # Pick the probability estimate once rather than checking for
+        # smoothing on every call
+        if self.smoothing:
+            self._probability = self._laplace_probability
+        else:
+            self._probability = self._mle_probability
 
 ##############################################################################
 ############################# Private Methods ################################
@@ -33,86 +43,109 @@ class NGram(object):
         For internal use only.  Used by constructor to read the file passed.
         '''
 
-        # build a regular expression for line parsing (based on N)
-        # The regex should end up something like this:
-        # "([\w<>/]+) (?=([\w<>/]+) ... ([\w<>/]+))"
-        # Where the amount of look-ahead groups is equal to N - 1
-        regexstring = "([\w<>/]+)"
-        if self.N > 1:
-            regexstring += " (?=([\w<>/]+)"
-            for i in range(0, self.N - 2):
-                regexstring += " ([\w<>/]+)"
-            regexstring += ")"
-        self.regex = re.compile(regexstring)
-
-        for line in trainingdata.readlines():
-            # Add the start and stop symbol the line
-            line = '<s> ' + line.rstrip() + ' </s>'
-
-            # If N > 1, then the regex generated above will never match the
-            # last N-1 words in the line, so they need to be added to the
-            # wordcount manually
-            for i in range(1, self.N):
-                self.wordcount[line.split()[-i]] += 1
-
-            for ngram in re.findall(self.regex, line):
-                if self.N == 1:
-                    self.wordcount[ngram] += 1
-                    # Note: items in the ngrams counters are always tuples,
-                    # even if it is a single word (this makes processing
-                    # consistent in other parts of the code)
-                    self.ngrams[(ngram,)] += 1
-                else:
-                    self.wordcount[ngram[0]] += 1
-                    self.ngrams[ngram] += 1
-
-        # If we are smoothing the model, then if N is 1, just add one to every
-        # word in the wordcounter and ngram counter. If N is greater than 1,
-        # get the Cartesian Product of the wordcount set by itself and add all
-        # of the ngrams generated to the ngram counter.
-        if self.smoothing:
+        for line in trainingdata:
+            # Add the start and stop symbol the line.  Words are interned so
+            # every ngram key shares a single string object per word.
+            words = ['<s>'] + list(map(intern, line.split())) + ['</s>']
+
+            # Slide a window of N words across the line.
+            # Note: items in the ngrams counters are always tuples, even if
+            # it is a single word (this makes processing consistent in other
+            # parts of the code)
+            self.wordcount.update(words)
+            self.ngrams.update(self._ngrams_in(words))
+
+            # Count the probability denominators in the same pass, so
+            # ngram_probability does not have to rescan the model on every
+            # call.  Every ngram's first N-1 words form a window that stops
+            # before the last word of the line.  For N = 1 the prefix is
+            # always the empty tuple, so it holds the total word count.
             if self.N == 1:
-                for word in self.wordcount:
-                    self.wordcount[word] += 1
-                    self.ngrams[(word,)] += 1
+                self.prefix_totals[()] += len(words)
             else:
-                allngrams = product(self.wordcount, repeat=self.N)
-                for ngram in allngrams:
-                    self.ngrams[ngram] += 1
+                self.prefix_totals.update(zip(*[words[i:-1]
+                    for i in range(self.N - 1)]))
 
+        # Laplace Add-1 smoothing is applied in ngram_probability rather
+        # than by adding one to every possible ngram here, which would mean
+        # storing V^N entries for a vocabulary of size V.
+        self.V = len(self.wordcount)
 
-    def _pmf(self, cmpfunc):
+    def _mle_probability(self, ngram):
         '''
-        Build a probability mass function table based upon the condition
-        specified in the lambda cmpfunc.
-        For internal use only.  Used by the sentence generator.
+        Returns the unsmoothed probability of the ngram passed.
+        For internal use only.  Used by ngram_probability.
         '''
-        mass = list()
-        psum = 0.0
-        for ngram in [n for n in self.ngrams if cmpfunc(n)]:
-            probability = self.ngram_probability(ngram)
-            mass.append((ngram, probability + psum))
-            psum += probability
+        return self.ngrams[ngram] / self.prefix_totals[ngram[:-1]]
 
-        return mass
+
+    def _laplace_probability(self, ngram):
+        '''
+        Returns the Laplace Add-1 smoothed probability of the ngram passed.
+        Every ngram made from words in the vocabulary implicitly has one extra
+        count, so each prefix has V extra counts spread over its possible next
+        words.
+        For internal use only.  Used by ngram_probability.
+        '''
+        count = self.ngrams[ngram]
+        total = self.prefix_totals[ngram[:-1]]
+        if all(w in self.wordcount for w in ngram[:-1]):
+            total += self.V
+            if ngram[-1] in self.wordcount:
+                count += 1
+        return count / total
+
+
+    def _ngrams_in(self, words):
+        '''
+        Returns an iterator over the overlapping N word tuples in the list
+        words.  This is the counting kernel shared by training and scoring.
+        For internal use only.
+        '''
+        return zip(*[words[i:] for i in range(self.N)])
+
+
+    def _build_successor_index(self):
+        '''
+        Index every ngram by its N-1 word prefix so the sentence generator can
+        find the possible next ngrams without scanning the whole model.
+        For internal use only.  Used by constructor after training.
+        '''
+        self._succ = dict()
+        self._cum = dict()
+        for ngram in self.ngrams:
+            self._succ.setdefault(ngram[:-1], []).append(ngram)
 
 
-    def _pmf_selection(self, r, mass_distribution):
+    def _cum_for(self, prefix):
         '''
-        Loop through the proabability masses in the distribution, comparing r
-        to the current_mass.  If r is within the current mass, return the ngram
-        associated with said mass.
+        Returns the ngrams following prefix along with their cumulative
+        probabilities, building and caching them on first use.
         For internal use only.  Used by the sentence generator.
         '''
-        lastmass = 0.0
-        return_ngram = None
-        for (ngram, mass) in mass_distribution:
-            if r > lastmass and r <= mass:
-                return_ngram = ngram
-                break
+        try:
+            return self._cum[prefix]
+        except KeyError:
+            if self.smoothing:
+                # With smoothing any word in the vocabulary can follow
+                ngrams_list = [prefix + (word,) for word in self.wordcount]
             else:
-                lassmass = mass
-        return return_ngram
+                ngrams_list = self._succ.get(prefix, [])
+            self._cum[prefix] = self._pmf(ngrams_list)
+            return self._cum[prefix]
+
+
+    def _pmf(self, ngrams):
+        '''
+        Build a probability mass function table for the ngrams passed.
+        Returns the ngrams and a parallel list of their cumulative
+        probabilities.
+        For internal use only.  Used by the sentence generator.
+        '''
+        ngrams_list = list(ngrams)
+        cum = list(accumulate(self.ngram_probability(ngram)
+            for ngram in ngrams_list))
+        return ngrams_list, cum
 
 ##############################################################################
 ############################## Public Methods ################################
@@ -121,15 +154,17 @@ class NGram(object):
     def ngram_probability(self, ngram):
         '''
         Returns the individual probability of the ngram passed.
-            -ngram: Some iterable of strings
+            -ngram: A tuple of strings
         '''
-        probability = 0.0
-        if self.N == 1:
-            probability = self.ngrams[ngram] / sum(self.wordcount.values())
-        else:
-            # This may be wrong for N > 2; Verify
-            probability = self.ngrams[ngram] / sum([value for (key, value) in
-                self.ngrams.items() if key[:-1] == ngram[:-1]])
+        # The model does not change after training, so each probability only
+        # needs to be computed once
+        try:
+            return self._probability_cache[ngram]
+        except KeyError:
+            pass
+
+        probability = self._probability(ngram)
+        self._probability_cache[ngram] = probability
         return probability
 
 
@@ -138,19 +173,15 @@ class NGram(object):
         Returns the probability of a given sentence in log10.
             -sentence: string of words in the model vocabulary
         '''
-        sentence = '<s> ' + sentence + ' </s>'
-
-        probability = 0.0
-
-        for ngram in re.findall(self.regex, sentence):
-            if self.N == 1:
-                ngram = (ngram,)
-            try:
-                probability += log10(self.ngram_probability(ngram))
-            except ValueError:
-                probability = float('-inf')
+        words = ['<s>'] + sentence.split() + ['</s>']
 
-        return probability
+        # Score the whole sentence in one pass.  A zero probability anywhere
+        # (or a context never seen in training) makes the sentence -inf.
+        try:
+            return sum(map(log10,
+                map(self.ngram_probability, self._ngrams_in(words))))
+        except (ValueError, ZeroDivisionError):
+            return float('-inf')
 
 
     def get_model_formatted(self):
@@ -167,37 +198,28 @@ class NGram(object):
         else:
             returnstring = "%d-gram Model" % self.N
 
-        # Create a copy of the ngram set to do the actual printing
-        # This is so if we are doing smoothing, we only print the original
-        # ngrams present after smoothing (those with a count > 1)
-        working_copy = self.ngrams
+        # Only the ngrams seen in the training data are printed.  If we are
+        # smoothing, their counts are shown with the added one.
+        extra = 0
         if self.smoothing:
             returnstring += " (Laplace Add-1 Smoothing)"
-            # remove all of the 1-counted ngrams from the copy
-            working_copy = Counter({key: value for (key, value) in
-                self.ngrams.items()
-                if value > 1})
-
-        # Generate our table header
-        returnstring += ":" + linesep
-        returnstring += "N-Gram".ljust(self.N * 10)
-        returnstring += "Count".ljust(8)
-        returnstring += "Probability"
-
-        for ngram in working_copy:
-            returnstring += linesep
+            extra = 1
+
+        # Generate our table header, then collect one row per ngram and join
+        # them all at the end
+        rows = [returnstring + ":",
+            "N-Gram".ljust(self.N * 10) + "Count".ljust(8) + "Probability"]
+
+        for (ngram, count) in self.ngrams.items():
             if self.N == 1:
-                returnstring += str(ngram[0]).ljust(10*self.N)
+                ngram_string = str(ngram[0])
             else:
-                ngram_string='[' + ngram[0]
-                for i in range(1, len(ngram)):
-                    ngram_string += ', ' + ngram[i]
-                ngram_string += ']'
-                returnstring += ngram_string.ljust(10*self.N)
-            returnstring += str(working_copy[ngram]).ljust(8)
-            returnstring += "%0.4f" % self.ngram_probability(ngram)
+                ngram_string = '[' + ', '.join(ngram) + ']'
+            rows.append(ngram_string.ljust(10*self.N)
+                + str(count + extra).ljust(8)
+                + "%0.4f" % self.ngram_probability(ngram))
 
-        return returnstring
+        return linesep.join(rows)
 
 
     def generate_sentence(self, sentence_count=1):
@@ -211,40 +233,46 @@ class NGram(object):
 
         sentences = list()
 
-        for i in range(0, sentence_count):
-            current_sentence = str()
-            current_ngram = None
-            mass_distribution = list()
-            if self.N > 1:
-                # if N is greater than 1, then the initial mass distribution
-                # will need to be for all of the ngrams that start with '<s>'
-                # Then, an ngram is chosen and the entire ngram is added to the
-                # sentence as the start.
-                mass_distribution = self._pmf(lambda x : x[0] == '<s>')
-                r = random.random()
-                current_ngram = self._pmf_selection(r, mass_distribution)
-                current_sentence = " ".join(current_ngram)
+        if self.N > 1:
+            # if N is greater than 1, then the initial mass distribution will
+            # need to be for all of the ngrams that start with '<s>'.  Then,
+            # an ngram is chosen for each sentence and the entire ngram is
+            # added to the sentence as the start.
+            if self.smoothing:
+                ngrams_list, cum = self._pmf(('<s>',) + ngram for ngram in
+                    product(self.wordcount, repeat=self.N - 1))
             else:
-                # if N is 1, then the mass distribution is the word
-                # probabilities.
-                mass_distribution = self._pmf(lambda x : True)
-                current_ngram = ('<s>',)
-                current_sentence = '<s>'
+                ngrams_list, cum = self._pmf(n for n in self.ngrams
+                    if n[0] == '<s>')
+            starts = [ngrams_list[min(bisect_left(cum, random.random()),
+                len(cum) - 1)] for i in range(0, sentence_count)]
+        else:
+            starts = [('<s>',)] * sentence_count
+
+        # Every generated word needs a distribution lookup and a random draw,
+        # so bind those to locals once for the whole batch
+        cum_cache = self._cum
+        cum_for = self._cum_for
+        draw = random.random
+
+        for current_ngram in starts:
+            words = list(current_ngram)
 
             # Loop until our latest word is the stop symbol
             while current_ngram[-1] != '</s>':
-                r = random.random()
-                if self.N > 1:
-                    # If N is greater than 1, the mass distribution needs to be
-                    # regenerated every iteration to reflect what our new
-                    # current word is.
-                    # Note: The lambda used here works for Unigrams and
-                    # Bigrams, but it has not been tested for Trigrams or other
-                    # N-Grams.
-                    mass_distribution = self._pmf(lambda x : x[:-1] ==
-                            current_ngram[1:])
-
-                current_ngram = self._pmf_selection(r, mass_distribution)
-                current_sentence += " " + current_ngram[-1]
-            sentences.append(current_sentence)
+                # The next ngram must start with the last N-1 words of the
+                # current one, so look up the (cached) distribution for that
+                # prefix.  For N = 1 the prefix is always the empty tuple, so
+                # this is just the word probabilities.
+                prefix = current_ngram[1:]
+                if prefix in cum_cache:
+                    ngrams_list, cum = cum_cache[prefix]
+                else:
+                    ngrams_list, cum = cum_for(prefix)
+                index = bisect_left(cum, draw())
+                if index == len(cum):
+                    index -= 1
+                current_ngram = ngrams_list[index]
+                words.append(current_ngram[-1])
+            sentences.append(" ".join(words))
         return sentences
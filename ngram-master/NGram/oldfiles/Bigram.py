@@ -1,12 +1,14 @@
 '''
 Bigram Language Model
+Superseded by NGram.NGram (with N = 2); kept for reference only.
 '''
 
 from .NGram import NGram
 from collections import Counter
 from math import log10
-from re import findall
 from random import random, seed
+from bisect import bisect_left
+from itertools import accumulate
 
 class Bigram(NGram):
     '''
@@ -19,60 +21,55 @@ class Bigram(NGram):
         super(Bigram, self).__init__(filename)
         self.name = "Bigram Language Model"
         self.laplace = False
+        self.V = len(self.unigram_counter)
         if laplace:
             self.laplace = True
             self.name += " (Laplace Smoothing)"
-            for word1 in self.unigram_counter:
-                for word2 in self.unigram_counter:
-                    self.unigram_counter[word1] += 1
-                    self.counter[(word1, word2)] += 1
+
+    def _entry_count(self, entry):
+        '''
+        Returns the bigram count, including the added one if we are doing
+        laplace smoothing
+        '''
+        if self.laplace:
+            return self.counter[entry] + 1
+        return self.counter[entry]
 
     def _entry_probability(self, entry):
         '''
-        Returns the bigram probability
+        Returns the bigram probability.  Laplace smoothing is applied in
+        closed form: every pair of known words has one extra count, so each
+        known first word has V extra counts.
         '''
-        return float(self.counter[entry]) / self.unigram_counter[entry[0]]
+        count = self.counter[entry]
+        total = self.unigram_counter[entry[0]]
+        if self.laplace and entry[0] in self.unigram_counter:
+            total += self.V
+            if entry[1] in self.unigram_counter:
+                count += 1
+        return float(count) / total
 
     def _filecount(self, trainingfile):
-        for line in trainingfile.readlines():
-            line = '<s> ' + line.rstrip() + ' </s>'
-
-            # The regex match below will never match the last word in a string,
-            # so add to the </s> counter here
-            self.unigram_counter['</s>'] += 1
+        for line in trainingfile:
+            words = ['<s>'] + line.split() + ['</s>']
 
-            for bigram in findall('([\w<>/]+) (?=([\w<>/]+))', line):
-                self.counter[bigram] += 1
-                self.unigram_counter[bigram[0]] += 1
+            # Each word is counted once and paired with the word after it
+            self.unigram_counter.update(words)
+            self.counter.update(zip(words, words[1:]))
 
         self.total = sum(self.counter.values())
 
-    def get_model_info_formatted(self):
-        '''
-        If we are doing laplace smoothing, remove all the 1 values and call the
-        string function.  If not, call the string function like normal
-        '''
-        if self.laplace:
-            tmp = self.counter.copy()
-            self.counter = Counter({pair: tmp[pair] for pair in tmp if tmp[pair] > 1})
-            returnstring = super(Bigram, self).get_model_info_formatted()
-            self.counter = tmp.copy()
-            return returnstring
-        else:
-            return super(Bigram, self).get_model_info_formatted()
-
     def compute_probability(self, string):
         '''
         Compute the probability of the supplied sentence based on the model.
         '''
-        string = '<s> ' + string + ' </s>'
+        words = ['<s>'] + string.split() + ['</s>']
 
         probability = float()
 
-        for pair in findall(r'([\w<>/]+) (?=([\w<>/]+))', string):
+        for pair in zip(words, words[1:]):
             try:
-                probability += log10(float(self.counter[pair]) /
-                        self.unigram_counter[pair[0]])
+                probability += log10(self._entry_probability(pair))
             except ValueError:
                 probability = float('-inf')
 
@@ -82,32 +79,33 @@ class Bigram(NGram):
         seed()
 
         sentence_list = list()
-        massdist = list()
 
+        # Index the possible next pairs by their first word once, then build
+        # the mass distribution for a word the first time it is needed
+        successors = dict()
+        for pair in self.counter:
+            if pair[1] != '<s>':
+                successors.setdefault(pair[0], []).append(pair)
+        massdist = dict()
 
         for i in range(0, count):
             sentence = '<s>'
             current_pair = ('', '<s>')
             while current_pair[1] != '</s>':
-
-                massdist.clear()
-                # generate our mass distribution function for the current
-                # existing word
-                s = 0.0
-                for pair in [p for p in self.counter if p[0] == current_pair[1]
-                        and p[1] != '<s>']:
-                    p = self._entry_probability(pair)
-                    massdist.append((pair, p + s))
-                    s += p
-
-                r = random()
-                lastmass = 0.0
-                for (pair, mass) in massdist:
-                    if r > lastmass and r <= mass:
-                        current_pair = pair
-                        break
+                word = current_pair[1]
+                if word not in massdist:
+                    if self.laplace:
+                        # With smoothing any known word can follow
+                        pairs = [(word, w) for w in self.unigram_counter
+                            if w != '<s>']
                     else:
-                        lastmass = mass
+                        pairs = successors.get(word, [])
+                    massdist[word] = (pairs, list(accumulate(
+                        self._entry_probability(pair) for pair in pairs)))
+
+                pairs, mass = massdist[word]
+                current_pair = pairs[min(bisect_left(mass, random()),
+                    len(mass) - 1)]
 
                 sentence += ' ' + current_pair[1]
 
@@ -1,5 +1,6 @@
 '''
 Base Class for Unigram and Bigram models
+Superseded by NGram.NGram; kept for reference only.
 '''
 
 from collections import Counter
@@ -36,6 +37,13 @@ class NGram(object):
         '''
         raise NotImplementedError("Not Implemented in Base Class")
 
+    def _entry_count(self, entry):
+        '''
+        Returns the count of an individual entry as shown in the model info.
+        Inheriting classes may override this to show adjusted counts.
+        '''
+        return self.counter[entry]
+
     def _entry_probability(self, entry):
         '''
         Returns the probability of an individual entry
@@ -52,7 +60,7 @@ class NGram(object):
         for entry in self.counter:
             returnstring += linesep
             returnstring += str(entry).ljust(20)
-            returnstring += str(self.counter[entry]).ljust(6)
+            returnstring += str(self._entry_count(entry)).ljust(6)
             returnstring += "%0.4f" % self._entry_probability(entry)
 
         return returnstring
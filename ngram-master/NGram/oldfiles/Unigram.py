@@ -1,11 +1,14 @@
 '''
 Unigram Language Model
+Superseded by NGram.NGram (with N = 1); kept for reference only.
 '''
 
 from .NGram import NGram
 from os import linesep
 from math import log10
 from random import seed, random
+from bisect import bisect_left
+from itertools import accumulate
 
 class Unigram(NGram):
     '''
@@ -32,11 +35,9 @@ class Unigram(NGram):
         '''
         Count the occurances of individual words in a file
         '''
-        for line in trainingfile.readlines():
+        for line in trainingfile:
             line = '<s> ' + line.rstrip() + ' </s>'
-
-            for word in line.split():
-                self.counter[word] += 1
+            self.counter.update(line.split())
 
         self.total = sum(self.counter.values())
 
@@ -58,12 +59,10 @@ class Unigram(NGram):
     def generate_sentence(self, count):
         seed()
 
-        dist = list()
-        s = 0.0
-        for word in [w for w in self.counter if w != '<s>']:
-            p = self.counter[word] / (self.total - self.counter['<s>'])
-            dist.append((word, p + s))
-            s += p
+        words = [w for w in self.counter if w != '<s>']
+        denominator = self.total - self.counter['<s>']
+        dist = list(accumulate(self.counter[word] / denominator
+            for word in words))
 
         sentencelist = list()
 
@@ -71,15 +70,8 @@ class Unigram(NGram):
             sentence = '<s>'
             current_word = str()
             while current_word != '</s>':
-                r = random()
-                lastmass = 0.0
-                for (word, mass) in dist:
-                    if r > lastmass and r <= mass:
-                        current_word = word
-                        break
-                    else:
-                        lastmass = mass
-
+                index = min(bisect_left(dist, random()), len(dist) - 1)
+                current_word = words[index]
                 sentence += ' ' + current_word
 
             sentencelist.append(sentence)